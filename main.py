@@ -9,32 +9,39 @@ Features:
 - Multi-site scraping (LinkedIn, Indeed)
 - Experience filtering (Removes Senior/Lead roles)
 - Robust connection handling (Retries on network failure)
-- Professional Sheet formatting (Bolding, Freezing, Checkboxes)
+- Professional Sheet formatting (Bolding, Freezing, Checkboxes), batched with each upload chunk
 
 Author: Surya Prakash Baid
 Date: 2026-02-03
 """
 
 import os
+import asyncio
+import re
+import json
 import time
+import hashlib
+import mmap
+import unicodedata
+import sqlite3
 import logging
-from typing import List, Optional
+from pathlib import Path
+from contextlib import closing
+from typing import List, Optional, Set, Tuple
 
 import pandas as pd
-import PyPDF2
+import pypdfium2 as pdfium
 import gspread
+import requests
+import urllib3
 from dotenv import load_dotenv
 from google import genai
 from oauth2client.service_account import ServiceAccountCredentials
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
 from jobspy import scrape_jobs
-
-# --- Optional Formatting Dependencies ---
-try:
-    from gspread_formatting import format_cell_range, cellFormat, textFormat
-    from gspread import DataValidationRule, BooleanCondition
-    FORMATTING_AVAILABLE = True
-except ImportError:
-    FORMATTING_AVAILABLE = False
+from tenacity import (
+    before_sleep_log, retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+)
 
 # --- Configuration ---
 load_dotenv()
@@ -42,7 +49,18 @@ CONFIG = {
     "GEMINI_KEY": os.getenv("GEMINI_API_KEY"),
     "CREDS_FILE": "credentials.json",
     "RESUME_FILE": "Surya_Prakash_Baid.pdf",
+    "RESUME_CHARS": 3000,  # Resume context sent to Gemini
     "SHEET_NAME": "Daily_Job_Hunt",
+    "SHEETS_MAX_ATTEMPTS": 5,
+    "UPLOAD_BATCH_SIZE": 500,  # Rows per batch_update request
+    "UPLOAD_DELAY": 1.1,  # Seconds between upload chunks
+    "CACHE_DIR": ".cache",
+    "SEEN_DB": "seen.db",  # Local index of links already uploaded to the sheet
+    "QUERY_CACHE_TTL": 7 * 86400,  # Seconds before cached queries are regenerated
+    "SITES": ["linkedin", "indeed"],
+    "SHEET_COLUMNS": ['site', 'title', 'company', 'location', 'date_posted', 'apply_link'],
+    "STRING_COLUMNS": ['title', 'company', 'location', 'site', 'apply_link'],
+    "REQUEST_DELAY": 2,
     "SENIOR_KEYWORDS": [
         r'\bsenior\b', r'\blead\b', r'\bmanager\b', r'\bprincipal\b',
         r'\barchitect\b', r'\bhead\b', r'\bdirector\b', r'\bvp\b',
@@ -57,65 +75,178 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Compiled once so every filter call reuses the same pattern object.
+# A multi-keyword automaton (e.g. Aho-Corasick) is not worth it here: a run
+# filters a few dozen titles, and this alternation is a single regex scan.
+SENIOR_RE = re.compile('|'.join(CONFIG["SENIOR_KEYWORDS"]), re.IGNORECASE)
+
+# Sheet layout, resolved to column indexes and A1 ranges once at import
+SHEET_HEADER = CONFIG["SHEET_COLUMNS"] + ['Applied?']
+LINK_COL = SHEET_HEADER.index('apply_link') + 1
+CHECKBOX_COL = rowcol_to_a1(1, len(SHEET_HEADER)).rstrip('1')
+HEADER_RANGE = f"A1:{CHECKBOX_COL}1"
+
+def _is_transient_error(e: BaseException) -> bool:
+    """
+    Returns True for errors worth retrying: rate limits (429), server errors (5xx)
+    and network failures. Auth and other 4xx errors fail fast.
+    """
+    if isinstance(e, gspread.exceptions.APIError):
+        status = e.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(e, (ConnectionError, requests.exceptions.RequestException))
+
+_sheets_retry = retry(
+    wait=wait_exponential_jitter(initial=1, max=30),
+    stop=stop_after_attempt(CONFIG["SHEETS_MAX_ATTEMPTS"]),
+    retry=retry_if_exception(_is_transient_error),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True
+)
+
+@_sheets_retry
+def _open_existing_sheet(client: gspread.Client) -> gspread.Worksheet:
+    """
+    Opens the target Google Sheet. Opening is read-only, so transient failures
+    are retried with exponential backoff and jitter.
+    """
+    return client.open(CONFIG["SHEET_NAME"]).sheet1
+
+def _create_sheet(client: gspread.Client, creds: ServiceAccountCredentials) -> gspread.Worksheet:
+    """
+    Creates the target Google Sheet. Not retried: creating is not idempotent,
+    and a retry could leave a half-created sheet reported as pre-existing.
+    """
+    logger.info(f"Sheet '{CONFIG['SHEET_NAME']}' not found. Creating new sheet.")
+    sheet = client.create(CONFIG["SHEET_NAME"]).sheet1
+    try:
+        client.insert_permission(sheet.spreadsheet.id, creds.service_account_email, perm_type='user', role='owner')
+    except Exception as e:
+        # The service account already owns the sheet it created
+        logger.warning(f"Could not grant owner permission on the new sheet: {e}")
+    return sheet
+
+def _open_sheet() -> Tuple[gspread.Worksheet, bool]:
+    """
+    Authenticates and opens (or creates) the target Google Sheet.
+
+    Returns:
+        Tuple[gspread.Worksheet, bool]: The worksheet, and whether it was just created.
+    """
+    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+    creds = ServiceAccountCredentials.from_json_keyfile_name(CONFIG["CREDS_FILE"], scope)
+    client = gspread.authorize(creds)
+
+    try:
+        return _open_existing_sheet(client), False
+    except gspread.exceptions.SpreadsheetNotFound:
+        return _create_sheet(client, creds), True
+
 def _get_sheet_client() -> Optional[gspread.Worksheet]:
     """
     Helper function to authenticate and retrieve the Google Sheet.
     Includes a Retry Mechanism for stability against network blips.
+    If the sheet had to be (re)created, the local link index is cleared so the
+    new sheet gets its header and no job is treated as already uploaded.
     """
-    max_retries = 3
-    scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-    
-    for attempt in range(max_retries):
-        try:
-            creds = ServiceAccountCredentials.from_json_keyfile_name(CONFIG["CREDS_FILE"], scope)
-            client = gspread.authorize(creds)
-            
-            try:
-                return client.open(CONFIG["SHEET_NAME"]).sheet1
-            except gspread.exceptions.SpreadsheetNotFound:
-                logger.info(f"Sheet '{CONFIG['SHEET_NAME']}' not found. Creating new sheet.")
-                sheet = client.create(CONFIG["SHEET_NAME"]).sheet1
-                client.insert_permission(sheet.spreadsheet.id, creds.service_account_email, perm_type='user', role='owner')
-                return sheet
-                
-        except Exception as e:
-            logger.warning(f"Connection attempt {attempt + 1}/{max_retries} failed: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(5)  # Wait 5 seconds before trying again
-            else:
-                logger.critical(f"Google Sheets connection failed after {max_retries} attempts.")
-                return None
+    try:
+        sheet, created = _open_sheet()
+    except Exception as e:
+        logger.critical(f"Google Sheets connection failed: {e}")
+        return None
+
+    if created:
+        _reset_seen_db()
+    return sheet
+
+def _read_resume_text() -> str:
+    """
+    Extracts text from the resume PDF with pypdfium2 (C-backed PDFium),
+    stopping once enough context is collected.
+
+    Returns:
+        str: The resume text, truncated to CONFIG["RESUME_CHARS"].
+    """
+    pdf = pdfium.PdfDocument(CONFIG["RESUME_FILE"])
+    try:
+        text = ""
+        for page in pdf:
+            text += page.get_textpage().get_text_range()
+            if len(text) >= CONFIG["RESUME_CHARS"]:
+                break
+    finally:
+        pdf.close()
+
+    return text[:CONFIG["RESUME_CHARS"]]
+
+def _is_valid_query_list(queries) -> bool:
+    """
+    Checks that queries is a non-empty list of 'Role | Location' strings,
+    each splitting into exactly a non-empty role and location.
+    """
+    if not isinstance(queries, list) or not queries:
+        return False
+    for query in queries:
+        if not isinstance(query, str):
+            return False
+        parts = query.split("|")
+        if len(parts) != 2 or not all(part.strip() for part in parts):
+            return False
+    return True
 
 def get_search_queries() -> List[str]:
     """
     Analyzes the user's resume using Gemini AI to generate relevant search queries.
+    Results are cached on disk keyed by the resume's hash, so Gemini is only
+    called again when the resume changes or the cache expires.
 
     Returns:
         List[str]: A list of search queries in 'Role | Location' format.
     """
     logger.info("Reading resume file...")
     try:
-        reader = PyPDF2.PdfReader(CONFIG["RESUME_FILE"])
-        text = "".join([page.extract_text() for page in reader.pages])
+        with open(CONFIG["RESUME_FILE"], "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            resume_hash = hashlib.sha256(mm).hexdigest()[:16]
+        cache_file = Path(CONFIG["CACHE_DIR"]) / f"queries_{resume_hash}.json"
+
+        if cache_file.exists() and cache_file.stat().st_mtime > time.time() - CONFIG["QUERY_CACHE_TTL"]:
+            cached_queries = json.loads(cache_file.read_text())
+            if _is_valid_query_list(cached_queries):
+                logger.info(f"Using cached queries from {cache_file}.")
+                return cached_queries
+            logger.warning(f"Ignoring malformed query cache {cache_file}.")
+
+        text = _read_resume_text()
 
         client = genai.Client(api_key=CONFIG["GEMINI_KEY"])
         
         prompt = f"""
-        Analyze this resume and generate a python list of 5 search queries for LinkedIn/Indeed.
+        Analyze this resume and generate a JSON array of 5 search queries for LinkedIn/Indeed.
         Focus on skills: Generative AI, Data Science, Python, Computer Vision, Deep Learning.
         Location: India (Remote or On-site).
         Format: ["Role | Location", "Role | Location"]
-        Resume context: {text[:3000]}
+        Resume context: {text}
         """
         
         response = client.models.generate_content(
             model='gemini-2.0-flash',
-            contents=prompt
+            contents=prompt,
+            config={
+                "response_mime_type": "application/json",
+                "response_schema": {"type": "array", "items": {"type": "string"}}
+            }
         )
         
-        # Clean and parse response
-        clean_text = response.text.replace("```python", "").replace("```", "").strip()
-        return eval(clean_text)
+        # Parse structured response (never eval model output)
+        queries = json.loads(response.text)
+        if not _is_valid_query_list(queries):
+            # Never cache a bad reply; it would break every run until expiry
+            raise ValueError(f"Unexpected query format from Gemini: {queries!r}")
+
+        cache_file.parent.mkdir(exist_ok=True)
+        cache_file.write_text(json.dumps(queries))
+        return queries
 
     except Exception as e:
         logger.error(f"AI Generation failed: {e}. Reverting to fallback queries.")
@@ -127,6 +258,30 @@ def get_search_queries() -> List[str]:
             "Software Engineer Fresher | India"
         ]
 
+def dedupe_queries(queries: List[str]) -> List[str]:
+    """
+    Removes near-duplicate queries (differing only in case, whitespace or
+    Unicode form) so the same search is not scraped twice.
+
+    Args:
+        queries (List[str]): Search queries, possibly with duplicates.
+
+    Returns:
+        List[str]: The queries in original order, first occurrence kept.
+    """
+    seen = set()
+    unique_queries = []
+    for query in queries:
+        key = unicodedata.normalize("NFKC", query).casefold().strip()
+        if key not in seen:
+            seen.add(key)
+            unique_queries.append(query)
+
+    removed_count = len(queries) - len(unique_queries)
+    if removed_count:
+        logger.info(f"Removed {removed_count} duplicate queries.")
+    return unique_queries
+
 def filter_experience(df: pd.DataFrame) -> pd.DataFrame:
     """
     Filters out job roles that require significant experience based on title keywords.
@@ -141,130 +296,353 @@ def filter_experience(df: pd.DataFrame) -> pd.DataFrame:
         return df
 
     initial_count = len(df)
-    pattern = '|'.join(CONFIG["SENIOR_KEYWORDS"])
-    
+
     # Filter rows where title does NOT match the senior pattern
-    filtered_df = df[~df['title'].str.contains(pattern, case=False, na=False, regex=True)]
+    titles = df['title']
+    if isinstance(titles.dtype, pd.StringDtype) and titles.dtype.storage == "pyarrow":
+        # Arrow kernels take the pattern string, not a compiled re object
+        mask = titles.str.contains(SENIOR_RE.pattern, case=False, na=False)
+    else:
+        mask = titles.str.contains(SENIOR_RE, na=False)
+    filtered_df = df[~mask.astype(bool)]
     
     removed_count = initial_count - len(filtered_df)
     logger.info(f"Filtered {removed_count} senior-level roles.")
     
     return filtered_df
 
-def run_scraper(queries: List[str]) -> pd.DataFrame:
+def _scrape_one(site: str, query: str, existing_links: Set[str]) -> Optional[pd.DataFrame]:
+    """
+    Scrapes a single 'Role | Location' query on one job site.
+
+    Args:
+        site (str): The jobspy site name (e.g. 'linkedin').
+        query (str): A search query in 'Role | Location' format.
+        existing_links (Set[str]): Links already uploaded; these are dropped immediately.
+
+    Returns:
+        Optional[pd.DataFrame]: The scraped jobs, or None if the scrape failed.
+    """
+    try:
+        role, loc = query.split("|")
+        logger.info(f"Scraping {site}: {role.strip()} in {loc.strip()}")
+
+        jobs = scrape_jobs(
+            site_name=[site],
+            search_term=role.strip(),
+            location=loc.strip(),
+            results_wanted=5,
+            hours_old=72,
+            country_indeed='India'
+        )
+
+        # Normalize Link Column
+        if 'job_url' in jobs.columns:
+            jobs['apply_link'] = jobs['job_url_direct'].fillna(jobs['job_url'])
+        else:
+            jobs['apply_link'] = jobs['job_url_direct']
+
+        # Drop already-uploaded jobs before they reach the rest of the pipeline
+        return jobs[~jobs['apply_link'].isin(existing_links)]
+
+    except Exception as e:
+        logger.warning(f"Failed to scrape '{query}' on {site}: {e}")
+        return None
+
+async def _scrape_site(site: str, queries: List[str], existing_links: Set[str]) -> List[pd.DataFrame]:
+    """
+    Runs every query against a single site, one at a time.
+    The blocking scrape runs in a worker thread; the delay between requests
+    keeps the load on each host polite.
+
+    Args:
+        site (str): The jobspy site name.
+        queries (List[str]): List of search terms.
+        existing_links (Set[str]): Links already uploaded to the sheet.
+
+    Returns:
+        List[pd.DataFrame]: The successful scrape results for this site.
+    """
+    site_jobs = []
+
+    for i, query in enumerate(queries):
+        if i > 0:
+            await asyncio.sleep(CONFIG["REQUEST_DELAY"])  # Respectful delay per host
+
+        jobs = await asyncio.to_thread(_scrape_one, site, query, existing_links)
+        if jobs is not None:
+            site_jobs.append(jobs)
+
+    return site_jobs
+
+async def run_scraper(queries: List[str], existing_links: Optional[Set[str]] = None) -> pd.DataFrame:
     """
     Executes the job scraper for each query in the list.
+    Each site gets its own task, so different hosts are scraped concurrently
+    while requests to the same host stay sequential.
 
     Args:
         queries (List[str]): List of search terms.
+        existing_links (Optional[Set[str]]): Links already uploaded to the sheet,
+            skipped as soon as each scrape returns.
 
     Returns:
         pd.DataFrame: A combined dataframe of all found jobs.
     """
-    all_jobs = []
-    
-    for query in queries:
-        try:
-            role, loc = query.split("|")
-            logger.info(f"Scraping: {role.strip()} in {loc.strip()}")
-            
-            jobs = scrape_jobs(
-                site_name=["linkedin", "indeed"],
-                search_term=role.strip(),
-                location=loc.strip(),
-                results_wanted=5,
-                hours_old=72,
-                country_indeed='India'
-            )
-            
-            # Normalize Link Column
-            if 'job_url' in jobs.columns:
-                jobs['apply_link'] = jobs['job_url_direct'].fillna(jobs['job_url'])
-            else:
-                jobs['apply_link'] = jobs['job_url_direct']
-                
-            all_jobs.append(jobs)
-            time.sleep(2)  # Respectful delay
-            
-        except Exception as e:
-            logger.warning(f"Failed to scrape '{query}': {e}")
+    if not queries:
+        return pd.DataFrame()
+
+    existing_links = existing_links or set()
+    per_site_queue = {site: queries for site in CONFIG["SITES"]}
+    results = await asyncio.gather(*[
+        _scrape_site(site, site_queries, existing_links)
+        for site, site_queries in per_site_queue.items()
+    ])
+    all_jobs = [jobs for site_jobs in results for jobs in site_jobs]
 
     if not all_jobs:
         return pd.DataFrame()
 
     combined_df = pd.concat(all_jobs, ignore_index=True)
+
+    # Compact, C++-backed string columns speed up filtering and dedup
+    string_cols = [c for c in CONFIG["STRING_COLUMNS"] if c in combined_df.columns]
+    combined_df = combined_df.astype({c: "string[pyarrow]" for c in string_cols})
+
+    # Overlapping queries often return the same posting; jobs without a link
+    # are kept, since pandas would treat all missing links as one duplicate
+    initial_count = len(combined_df)
+    combined_df = combined_df[combined_df['apply_link'].isna() | ~combined_df.duplicated('apply_link')]
+    logger.info(f"Removed {initial_count - len(combined_df)} duplicate jobs within this run.")
+
     return filter_experience(combined_df)
 
-def save_to_sheet(df: pd.DataFrame):
+def _is_unsent_write_error(e: BaseException) -> bool:
+    """
+    Returns True only for errors where the write certainly was not applied:
+    rate limits (429) and failures to establish the connection. Timeouts,
+    5xx and dropped responses are not retried, since appendCells is not
+    idempotent and a retry could append the rows twice.
+    """
+    if isinstance(e, gspread.exceptions.APIError):
+        return e.response.status_code == 429
+    if isinstance(e, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(e, requests.exceptions.ConnectionError) and e.args:
+        # Refused / unresolvable / connect-timeout errors arrive wrapped in MaxRetryError
+        reason = getattr(e.args[0], "reason", None)
+        return isinstance(reason, urllib3.exceptions.ConnectTimeoutError)
+    return False
+
+@retry(
+    wait=wait_exponential_jitter(initial=1, max=30),
+    stop=stop_after_attempt(CONFIG["SHEETS_MAX_ATTEMPTS"]),
+    retry=retry_if_exception(_is_unsent_write_error),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True
+)
+def _batch_update(sheet: gspread.Worksheet, batch_requests: List[dict]):
+    """
+    Sends a spreadsheets.batchUpdate, retrying only failures where nothing was written.
+    """
+    sheet.spreadsheet.batch_update({"requests": batch_requests})
+
+def _to_row_data(values: list) -> dict:
+    """
+    Converts a list of Python values into a Sheets API v4 RowData payload.
+    Booleans are sent as real booleans with checkbox validation on the cell
+    itself, so the checkbox always lands on the row that was appended.
+    """
+    cells = []
+    for value in values:
+        if isinstance(value, bool):
+            cells.append({
+                "userEnteredValue": {"boolValue": value},
+                "dataValidation": {"condition": {"type": "BOOLEAN"}, "showCustomUi": True}
+            })
+        else:
+            cells.append({"userEnteredValue": {"stringValue": str(value)}})
+    return {"values": cells}
+
+def _init_sheet(sheet: gspread.Worksheet, header: List[str], rows: List[dict], pending_requests: List[dict]):
+    """
+    Queues first-run initialization (header row, bold header, frozen row) onto
+    the pending batch, so a fresh sheet is set up in the same single
+    batch_update as the first data upload.
+
+    Args:
+        sheet (gspread.Worksheet): The target worksheet.
+        header (List[str]): Column names for row 1.
+        rows (List[dict]): Pending RowData payloads; the header is added first.
+        pending_requests (List[dict]): Pending batch_update requests.
+    """
+    rows.insert(0, _to_row_data(header))
+    pending_requests.append({
+        "repeatCell": {
+            "range": a1_range_to_grid_range(HEADER_RANGE, sheet.id),
+            "cell": {"userEnteredFormat": {"textFormat": {"bold": True}}},
+            "fields": "userEnteredFormat.textFormat.bold"
+        }
+    })
+    pending_requests.append({
+        "updateSheetProperties": {
+            "properties": {"sheetId": sheet.id, "gridProperties": {"frozenRowCount": 1}},
+            "fields": "gridProperties.frozenRowCount"
+        }
+    })
+
+def _open_seen_db() -> sqlite3.Connection:
+    """
+    Opens the local SQLite index of already-uploaded job links.
+    """
+    con = sqlite3.connect(CONFIG["SEEN_DB"])
+    con.execute("CREATE TABLE IF NOT EXISTS seen(link TEXT PRIMARY KEY)")
+    return con
+
+def _reset_seen_db():
+    """
+    Clears the local link index, e.g. after the sheet was recreated.
+    """
+    with closing(_open_seen_db()) as con:
+        con.execute("DELETE FROM seen")
+        con.commit()
+    logger.info("Cleared local link index for the new sheet.")
+
+def load_known_links() -> Set[str]:
+    """
+    Reads the links already uploaded to the sheet from the local index.
+    Makes no network calls; returns an empty set on a cold start.
+    """
+    with closing(_open_seen_db()) as con:
+        return set(row[0] for row in con.execute("SELECT link FROM seen WHERE link != ''"))
+
+def _load_seen_links(con: sqlite3.Connection, sheet: gspread.Worksheet) -> Tuple[Set[str], bool]:
+    """
+    Loads the set of links already in the sheet, preferring the local index.
+    On a cold start the index is bootstrapped from the sheet's 'apply_link' column.
+
+    Returns:
+        Tuple[Set[str], bool]: The known links and whether the sheet already
+        has its header row.
+    """
+    existing_links = set(row[0] for row in con.execute("SELECT link FROM seen WHERE link != ''"))
+    if existing_links:
+        return existing_links, True
+
+    # Only fetch the 'apply_link' column
+    existing_links_raw = sheet.col_values(LINK_COL)
+    # Jobs without a URL have an empty link; those must never count as seen
+    existing_links = set(link for link in existing_links_raw[1:] if link)
+    con.executemany("INSERT OR IGNORE INTO seen VALUES (?)", [(link,) for link in existing_links])
+    con.commit()
+    logger.info(f"Bootstrapped local link index with {len(existing_links)} links from the sheet.")
+    return existing_links, bool(existing_links_raw)
+
+def save_to_sheet(df: pd.DataFrame, sheet: gspread.Worksheet):
     """
     Saves new jobs to Google Sheets with duplicate checking and formatting.
+    Duplicates are checked against a local SQLite index, so warm runs skip
+    reading the sheet entirely. Writes (rows, header formatting, checkboxes) are
+    combined into one batch_update per chunk of UPLOAD_BATCH_SIZE rows, which
+    keeps round-trips low without sending oversized requests.
+
+    Args:
+        df (pd.DataFrame): The filtered jobs to upload.
+        sheet (gspread.Worksheet): The target worksheet.
     """
     if df.empty:
         logger.info("No jobs found to save.")
         return
 
-    sheet = _get_sheet_client()
-    if not sheet:
-        return
-
     # Prepare Data
-    cols = ['site', 'title', 'company', 'location', 'date_posted', 'apply_link']
-    available_cols = [c for c in cols if c in df.columns]
-    df = df[available_cols].astype(str)
+    # Missing columns become empty so values always line up with the header
+    df = df.reindex(columns=CONFIG["SHEET_COLUMNS"]).fillna("")
+    # Only stringify non-text columns (e.g. datetime 'date_posted')
+    for c in df.columns:
+        if not pd.api.types.is_string_dtype(df[c]):
+            df[c] = df[c].astype(str)
 
-    # Duplicate Check
-    try:
-        existing_data = sheet.get_all_values()
-        if len(existing_data) > 1:
-            # Assumes 'apply_link' is at index 5
-            existing_links = set(row[5] for row in existing_data[1:] if len(row) > 5)
-            df = df[~df['apply_link'].isin(existing_links)]
+    rows = []
+    pending_requests = []
+
+    with closing(_open_seen_db()) as con:
+        # Duplicate Check
+        try:
+            existing_links, has_header = _load_seen_links(con, sheet)
+            if has_header:
+                df = df[~df['apply_link'].isin(existing_links)]
             
-            if df.empty:
-                logger.info("All jobs already exist in the sheet.")
-                return
-        else:
-            # Initialize Sheet with Headers
-            header = cols + ['Applied?']
-            sheet.append_row(header)
-            if FORMATTING_AVAILABLE:
-                fmt = cellFormat(textFormat=textFormat(bold=True))
-                format_cell_range(sheet, 'A1:G1', fmt)
-                sheet.freeze(rows=1)
+                if df.empty:
+                    logger.info("All jobs already exist in the sheet.")
+                    return
+            else:
+                # Initialize Sheet with Headers
+                _init_sheet(sheet, SHEET_HEADER, rows, pending_requests)
 
-    except Exception as e:
-        logger.error(f"Error reading existing data: {e}")
-        return
+        except Exception as e:
+            logger.error(f"Error reading existing data: {e}")
+            return
 
-    # Append New Data
-    df['Applied?'] = "FALSE"
-    try:
-        sheet.append_rows(df.values.tolist())
-        logger.info(f"Successfully appended {len(df)} new jobs.")
-
-        # Apply Checkboxes (if library available)
-        if FORMATTING_AVAILABLE:
-            total_rows = len(sheet.get_all_values())
-            new_rows = len(df)
-            start_row = total_rows - new_rows + 1
-            
-            rule = DataValidationRule(
-                BooleanCondition('BOOLEAN'),
-                showCustomUi=True
-            )
-            sheet.set_data_validation(f"G{start_row}:G{total_rows}", rule)
-            logger.info("Checkbox validation applied.")
+        # Append New Data in size-bounded chunks
+        df['Applied?'] = False
+        values = df.values.tolist()
+        links = df['apply_link'].tolist()
+        batch_size = CONFIG["UPLOAD_BATCH_SIZE"]
+        uploaded = 0
 
-    except Exception as e:
-        logger.error(f"Failed to append data: {e}")
+        for i in range(0, len(values), batch_size):
+            if i > 0:
+                time.sleep(CONFIG["UPLOAD_DELAY"])  # Stay under the per-minute write quota
 
-if __name__ == "__main__":
+            batch = values[i:i + batch_size]
+            rows.extend(_to_row_data(row) for row in batch)
+
+            batch_requests = [{
+                "appendCells": {
+                    "sheetId": sheet.id,
+                    "rows": rows,
+                    "fields": "userEnteredValue,dataValidation"
+                }
+            }] + pending_requests
+
+            try:
+                _batch_update(sheet, batch_requests)
+            except Exception as e:
+                logger.error(f"Failed to append data: {e}")
+                break
+
+            con.executemany("INSERT OR IGNORE INTO seen VALUES (?)", [(link,) for link in links[i:i + batch_size] if link])
+            con.commit()
+            uploaded += len(batch)
+
+            # Header row and formatting only go out with the first chunk
+            rows = []
+            pending_requests = []
+
+        if uploaded:
+            logger.info(f"Successfully appended {uploaded} new jobs with checkboxes.")
+
+async def main():
+    """
+    Runs the full pipeline: query generation, scraping, and saving.
+    """
     logger.info("Starting Job Search Agent...")
     
-    search_queries = get_search_queries()
+    search_queries = dedupe_queries(get_search_queries())
     logger.info(f"Generated Queries: {search_queries}")
     
-    job_results = run_scraper(search_queries)
-    save_to_sheet(job_results)
+    # Open the sheet before loading known links, so a recreated sheet resets the index
+    sheet = _get_sheet_client()
+    if not sheet:
+        return
+
+    known_links = load_known_links()
+    logger.info(f"Loaded {len(known_links)} previously uploaded links.")
+
+    job_results = await run_scraper(search_queries, known_links)
+    save_to_sheet(job_results, sheet)
     
-    logger.info("Process completed.")
\ No newline at end of file
+    logger.info("Process completed.")
+
+if __name__ == "__main__":
+    asyncio.run(main())